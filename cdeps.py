@@ -1,18 +1,33 @@
 import os
 import re
+import mmap
+import codecs
 import sys
 import functools
-from typing import Tuple, Set, Dict, Optional, Collection
+import concurrent.futures
+from typing import Tuple, Iterator, Set, FrozenSet, Dict, Optional, Collection, NamedTuple
 
 SOURCE_EXTENSIONS = ['.c', '.cc', '.cp', '.cxx', '.cpp', '.c++', '.C']
 HEADER_EXTENSIONS = ['.h', '.hpp']
 
+# Ordered lists above give lookup priority, sets below are for membership tests
+_SOURCE_EXTENSIONS_SET = frozenset(SOURCE_EXTENSIONS)
+_HEADER_EXTENSIONS_SET = frozenset(HEADER_EXTENSIONS)
+
+# Names in a directory, as is and casefolded
+_Listing = Tuple[FrozenSet[str], FrozenSet[str]]
+
+_INCLUDE_RE = re.compile(
+    rb'(?:\A\xef\xbb\xbf|^)[ \t]*#[ \t]*include[ \t]*(?:"(?P<internal>[^"\n]*)"|<(?P<external>[^>\n]*)>)', re.MULTILINE)
+
 
 class SourcePair:
     """Represent a C/C++ source file associated with its header.
 
     A SourcePair can also be an independent source (e.g. 'main.c') or header (e.g. macros or templates).
     """
+    __slots__ = ('source', 'header', '_internal_dependencies', '_external_dependencies')
+
     def __init__(self, source: Optional[str], header: Optional[str]):
         assert source is not None or header is not None
         self.source = source
@@ -62,17 +77,23 @@ class SourcePair:
             self._resolve_dependencies()
         return self._external_dependencies
 
-    def _resolve_dependencies(self):
+    @property
+    def is_resolved(self) -> bool:
+        """Check whether the pair's dependencies have already been read from its files."""
+        return self._internal_dependencies is not None
+
+    def _resolve_dependencies(self, known: Optional[Dict[str, Tuple[Set[str], Set[str]]]] = None):
+        # known maps already parsed files to their dependencies, see resolve_all_dependencies
         self._internal_dependencies = set()
         self._external_dependencies = set()
-        if self.has_source:
-            internal, external = get_dependencies_from_file(self.source)
-            self._internal_dependencies.update(internal)
-            self._external_dependencies.update(external)
-        if self.has_header:
-            internal, external = get_dependencies_from_file(self.header)
-            self._internal_dependencies.update(internal)
-            self._external_dependencies.update(external)
+        for path in (self.source, self.header):
+            if path is not None:
+                if known is not None and path in known:
+                    internal, external = known[path]
+                else:
+                    internal, external = get_dependencies_from_file(path)
+                self._internal_dependencies.update(internal)
+                self._external_dependencies.update(external)
 
 
 def get_dependencies_from_file(path: str) -> Tuple[Set[str], Set[str]]:
@@ -81,42 +102,119 @@ def get_dependencies_from_file(path: str) -> Tuple[Set[str], Set[str]]:
     Internal dependencies are declared in '#include "..."' statements while external dependencies are
     in '#include <...>' statements.
     """
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _parsed_files.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = mtime, _parse_includes(path)
+        _parsed_files[path] = cached
+
+    internal, external = cached[1]
+    return set(internal), set(external)
+
+
+# Absolute paths mapped to their modification time and dependencies when they were last parsed.
+# Edited files get parsed again and replace their previous entry.
+_parsed_files: Dict[str, Tuple[int, Tuple[FrozenSet[str], FrozenSet[str]]]] = {}
+
+
+def _parse_includes(path: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
     internal = set()
     external = set()
 
-    with open(path, 'r') as file:
-        for line in file:
-            internal_match = re.search(r'#\s*include\s*"(.*)"', line)
-            external_match = re.search(r'#\s*include\s*<(.*)>', line)
-            if internal_match is not None:
-                internal.add(internal_match.group(1))
-            if external_match is not None:
-                external.add(external_match.group(1))
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return frozenset(), frozenset()  # Empty files cannot be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Let find jump between 'include' words and only run the regex on their lines,
+            # which is much faster than having the regex engine try every line of the file.
+            # Lines not starting with '#' are skipped without the regex, and there can be at most
+            # one directive per line. Directives are ASCII, so only captured names need decoding.
+            position = data.find(b'include')
+            while position != -1:
+                line_start = data.rfind(b'\n', 0, position) + 1
+                indent = data[line_start:position]
+                if line_start == 0 and indent.startswith(codecs.BOM_UTF8):
+                    indent = indent[len(codecs.BOM_UTF8):]
+                if indent.lstrip(b' \t')[:1] == b'#':
+                    match = _INCLUDE_RE.match(data, line_start)
+                    if match is not None:
+                        if match.group('internal') is not None:
+                            internal.add(match.group('internal').decode('utf-8', 'replace'))
+                        else:
+                            external.add(match.group('external').decode('utf-8', 'replace'))
+
+                line_end = data.find(b'\n', position)
+                if line_end == -1:
+                    break
+                position = data.find(b'include', line_end)
+
+    return frozenset(internal), frozenset(external)
+
+
+def resolve_all_dependencies(pairs: Collection[SourcePair]):
+    """Read the dependencies of every given pair at once, parsing files concurrently.
+
+    Files are mostly waited on rather than computed, so threads are enough to overlap reads.
+    """
+    pairs = [pair for pair in pairs if not pair.is_resolved]
+    paths = list({path for pair in pairs for path in (pair.source, pair.header) if path is not None})
+    if not paths:
+        return
+
+    max_workers = min(32, len(paths), (os.cpu_count() or 1) * 4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        known = dict(zip(paths, executor.map(get_dependencies_from_file, paths)))
+
+    for pair in pairs:
+        pair._resolve_dependencies(known)
+
 
-    return internal, external
+class _FileEntry(NamedTuple):
+    # A file path split once into its name (path without extension) and extension
+    path: str
+    name: str
+    ext: str
 
 
 def get_pairs_from_dir(base_dir: str) -> Set[SourcePair]:
     """Get every source pairs from a given directory."""
-    sources, headers = get_sources_and_headers_from_dir(base_dir)
-    return pair_sources_with_headers(sources, headers)
+    sources = []
+    headers = []
+    for path, ext in _walk_sources_and_headers(base_dir):
+        entry = _FileEntry(path, path[:len(path) - len(ext)], ext)
+        (sources if ext in _SOURCE_EXTENSIONS_SET else headers).append(entry)
+    return _pair_by_name(sources, headers)
 
 
 def get_sources_and_headers_from_dir(base_dir: str) -> Tuple[Set[str], Set[str]]:
     """Get every sources and headers from a given directory and return them as two separate sets."""
     sources = set()
     headers = set()
+    for path, ext in _walk_sources_and_headers(base_dir):
+        (sources if ext in _SOURCE_EXTENSIONS_SET else headers).add(path)
+    return sources, headers
 
-    base_dir = os.path.abspath(base_dir)
-    for dirpath, _dirnames, names in os.walk(base_dir):
-        for name in names:
-            name = os.path.join(dirpath, name)
-            if is_source(name):
-                sources.add(name)
-            elif is_header(name):
-                headers.add(name)
 
-    return sources, headers
+def _walk_sources_and_headers(base_dir: str) -> Iterator[Tuple[str, str]]:
+    # Yield the absolute path and extension of every source and header in a directory
+    # As with os.walk, symbolic links to directories are not followed and unreadable directories are skipped
+    stack = [os.path.abspath(base_dir)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        stack.append(entry.path)
+                    continue
+
+                ext = os.path.splitext(entry.name)[1]
+                if ext in _SOURCE_EXTENSIONS_SET or ext in _HEADER_EXTENSIONS_SET:
+                    yield entry.path, ext
 
 
 def has_extension(path: str, extensions: Collection[str]) -> bool:
@@ -134,8 +232,13 @@ def has_extension(path: str, extensions: Collection[str]) -> bool:
     return False
 
 
-is_source = functools.partial(has_extension, extensions=SOURCE_EXTENSIONS)
-is_header = functools.partial(has_extension, extensions=HEADER_EXTENSIONS)
+def _has_extension_in_set(path: str, extensions: FrozenSet[str]) -> bool:
+    # Faster than has_extension for single-suffix extensions such as SOURCE_EXTENSIONS and HEADER_EXTENSIONS
+    return os.path.splitext(path)[1] in extensions
+
+
+is_source = functools.partial(_has_extension_in_set, extensions=_SOURCE_EXTENSIONS_SET)
+is_header = functools.partial(_has_extension_in_set, extensions=_HEADER_EXTENSIONS_SET)
 
 
 def pair_sources_with_headers(sources: Collection[str], headers: Collection[str]) -> Set[SourcePair]:
@@ -146,17 +249,33 @@ def pair_sources_with_headers(sources: Collection[str], headers: Collection[str]
     >>> pairs == {SourcePair('a.cpp', None), SourcePair('b.cpp', 'b.h'), SourcePair(None, 'c.h')}
     True
     """
+    sources = [_FileEntry(source, *os.path.splitext(source)) for source in sources]
+    headers = [_FileEntry(header, *os.path.splitext(header)) for header in headers]
+    return _pair_by_name(sources, headers)
+
+
+def _pair_by_name(sources: Collection[_FileEntry], headers: Collection[_FileEntry]) -> Set[SourcePair]:
+    # Index files by name once instead of probing every extension for each file
+    source_names = {source.name for source in sources if source.ext in _SOURCE_EXTENSIONS_SET}
+
+    headers_by_name = {}
+    for header in headers:
+        if header.ext in _HEADER_EXTENSIONS_SET:
+            headers_by_name.setdefault(header.name, {})[header.ext] = header.path
+
     pairs = set()
 
     for source in sources:
-        if header := find_corresponding_header(source, headers):
-            pairs.add(SourcePair(source, header))
+        if candidates := headers_by_name.get(source.name):
+            # Same priority as find_corresponding_header when several headers share a name
+            header = candidates[min(candidates, key=HEADER_EXTENSIONS.index)]
+            pairs.add(SourcePair(source.path, header))
         else:
-            pairs.add(SourcePair(source, None))
+            pairs.add(SourcePair(source.path, None))
 
     for header in headers:
-        if not find_corresponding_source(header, sources):
-            pairs.add(SourcePair(None, header))
+        if header.name not in source_names:
+            pairs.add(SourcePair(None, header.path))
 
     return pairs
 
@@ -172,6 +291,10 @@ def find_corresponding_pair(path: str, pairs: Collection[str], extensions: Colle
     'file.hpp'
     """
     name = remove_extension(path)
+    if isinstance(pairs, frozenset):
+        # Immutable candidates can be indexed once and reused for every lookup
+        return _index_pairs_by_name(pairs, tuple(extensions)).get(name)
+
     for ext in extensions:
         pair = f'{name}{ext}'
         if pair in pairs:
@@ -179,6 +302,17 @@ def find_corresponding_pair(path: str, pairs: Collection[str], extensions: Colle
     return None
 
 
+@functools.lru_cache(maxsize=16)
+def _index_pairs_by_name(pairs: FrozenSet[str], extensions: Tuple[str, ...]) -> Dict[str, str]:
+    # Match on endings like find_corresponding_pair does, earlier extensions taking priority
+    index = {}
+    for ext in extensions:
+        for pair in pairs:
+            if pair.endswith(ext):
+                index.setdefault(pair[:len(pair) - len(ext)], pair)
+    return index
+
+
 find_corresponding_source = functools.partial(find_corresponding_pair, extensions=SOURCE_EXTENSIONS)
 find_corresponding_header = functools.partial(find_corresponding_pair, extensions=HEADER_EXTENSIONS)
 
@@ -190,25 +324,30 @@ def map_dependencies_from_pairs(pairs: Set[SourcePair], include_dirs: Collection
     { 'unit1': { 'dependency1', 'dependency2', ... }, 'unit2': { ... }, ... }
     """
     units = {}
+    include_dirs = tuple(os.path.abspath(dir) for dir in include_dirs)
+    # Caches are kept for this call only, so that files added or removed later are seen next time
+    listings = {}
+    found = {}
+    resolve_all_dependencies(pairs)
 
     for pair in pairs:
-        unit = pair.name
-        current_dir = os.path.dirname(unit)
+        unit = sys.intern(pair.name)
+        current_dir = os.path.abspath(os.path.dirname(unit))
 
         dependencies = set()
         for dependency in pair.internal_dependencies:
             try:
-                dependency = resolve_include_path(dependency, current_dir, include_dirs)
+                dependency = _resolve_include_path(dependency, current_dir, include_dirs, listings, found)
             except FileNotFoundError as exc:
                 print('warning:', exc)
                 continue
 
-            dependency = remove_extension(dependency)
+            dependency = sys.intern(remove_extension(dependency))
             if unit != dependency:
                 dependencies.add(dependency)
 
         for dependency in pair.external_dependencies:
-            dependency = remove_extension(dependency)
+            dependency = sys.intern(remove_extension(dependency))
             dependencies.add(dependency)
 
         units[unit] = dependencies
@@ -218,15 +357,44 @@ def map_dependencies_from_pairs(pairs: Set[SourcePair], include_dirs: Collection
 
 def resolve_include_path(name: str, current_dir: str, include_dirs: Collection[str] = []) -> str:
     """Resolve a C/C++ include path, trying current_dir first then include_dirs."""
-    include_dirs = [current_dir] + include_dirs
-    include_dirs = [os.path.abspath(dir) for dir in include_dirs]
+    include_dirs = tuple(os.path.abspath(dir) for dir in include_dirs)
+    return _resolve_include_path(name, os.path.abspath(current_dir), include_dirs, {}, {})
+
+
+def _resolve_include_path(name: str, current_dir: str, include_dirs: Tuple[str, ...],
+                          listings: Dict[str, _Listing], found: Dict[Tuple[str, str], Optional[str]]) -> str:
+    # Same as resolve_include_path, but directories must already be absolute.
+    # listings caches directory contents and found caches lookups, including failed ones (as None).
+    key = (name, current_dir)
+    if key not in found:
+        found[key] = _find_include_path(name, current_dir, include_dirs, listings)
+    if found[key] is None:
+        raise FileNotFoundError(f'{name!r} not found in {[current_dir, *include_dirs]}')
+    return found[key]
 
-    for include_dir in include_dirs:
+
+def _find_include_path(name: str, current_dir: str, include_dirs: Tuple[str, ...],
+                       listings: Dict[str, _Listing]) -> Optional[str]:
+    for include_dir in (current_dir, *include_dirs):
         path = os.path.normpath(os.path.join(include_dir, name))
-        if os.path.exists(path):
+        directory, filename = os.path.split(path)
+        if directory not in listings:
+            listings[directory] = _list_dir(directory)
+        names, folded_names = listings[directory]
+        if filename in names:
+            return path
+        # Only a different case can still exist, on case-insensitive file systems
+        if filename.casefold() in folded_names and os.path.exists(path):
             return path
+    return None
+
 
-    raise FileNotFoundError(f'{name!r} not found in {include_dirs}')
+def _list_dir(path: str) -> _Listing:
+    try:
+        names = frozenset(os.listdir(path))
+    except OSError:
+        names = frozenset()
+    return names, frozenset(name.casefold() for name in names)
 
 
 def get_dependent_units(units: Dict[str, Collection[str]], dependencies: Collection[str]) -> Tuple[Set[str], Set[str]]:
@@ -240,20 +408,25 @@ def get_dependent_units(units: Dict[str, Collection[str]], dependencies: Collect
     >>> unimpacted == {'d'}
     True
     """
-    impacted = dependencies.copy()
-
-    previous_length = 0
-    while len(impacted) > previous_length:
-        previous_length = len(impacted)
-        found = set(unit for unit, deps in units.items() if deps.intersection(impacted))
-        impacted.update(found)
-
-    units_set = set(units)
-    impacted.intersection_update(units_set)
-    unimpacted = units_set - impacted
+    dependents = {}
+    for unit, deps in units.items():
+        for dep in deps:
+            dependents.setdefault(dep, []).append(unit)
+
+    impacted = set(dependencies)
+    stack = list(impacted)
+    while stack:
+        for unit in dependents.get(stack.pop(), ()):
+            if unit not in impacted:
+                impacted.add(unit)
+                stack.append(unit)
+
+    impacted.intersection_update(units)
+    unimpacted = units.keys() - impacted
     return impacted, unimpacted
 
 
+@functools.lru_cache(maxsize=16384)
 def remove_extension(path: str) -> str:
     """Remove the extension of a filename if any.
 
@@ -2,6 +2,9 @@
 
 import unittest
 import os
+import copy
+import tempfile
+from unittest import mock
 
 import cdeps
 
@@ -21,10 +24,79 @@ def a(path: str) -> str:
 #     - constants.h     (no includes)
 #     - b.c             (includes <stdio.h>, "b.h", nonexistant "void.h")
 #     - b.h             (includes "constants.h")
+# - parsing/
+#     - bom.h           (UTF-8 BOM, includes "bom_first.h", <stdio.h>)
+#     - comment.h       (commented out includes, includes "real.h")
+#     - crlf.h          (CRLF line endings, includes "crlf_a.h", <crlf_b.h>)
+#     - words.h         ('include' in other lines, includes "after_define.h", <after_int.h>)
 
 
 class TestCdeps(unittest.TestCase):
 
+    def test_get_dependencies_from_file(self):
+        internal, external = cdeps.get_dependencies_from_file(a('sub/b.c'))
+        self.assertEqual(internal, {'b.h', 'void.h'})
+        self.assertEqual(external, {'stdio.h'})
+
+    def test_get_no_dependencies_from_file(self):
+        internal, external = cdeps.get_dependencies_from_file(a('sub/constants.h'))
+        self.assertEqual(internal, set())
+        self.assertEqual(external, set())
+
+    def test_lazy_source_pair(self):
+        pair = cdeps.SourcePair(a('main.c'), None)
+        self.assertFalse(pair.is_resolved)
+        self.assertEqual(pair.external_dependencies, {'stdio.h'})
+        self.assertTrue(pair.is_resolved)
+
+    def test_copy_unresolved_source_pair(self):
+        pair = cdeps.SourcePair(a('nonexistent.c'), None)
+        self.assertEqual(copy.copy(pair), pair)
+        self.assertFalse(pair.is_resolved)
+
+    def test_resolve_all_dependencies(self):
+        pairs = [cdeps.SourcePair(a('sub/b.c'), a('sub/b.h')), cdeps.SourcePair(None, a('sub/constants.h'))]
+        cdeps.resolve_all_dependencies(pairs)
+        self.assertTrue(all(pair.is_resolved for pair in pairs))
+        self.assertEqual(pairs[0].internal_dependencies, {'b.h', 'void.h', 'constants.h'})
+        self.assertEqual(pairs[0].external_dependencies, {'stdio.h'})
+        self.assertEqual(pairs[1].internal_dependencies, set())
+
+    def test_get_dependencies_from_file_with_bom(self):
+        internal, external = cdeps.get_dependencies_from_file(a('parsing/bom.h'))
+        self.assertEqual(internal, {'bom_first.h'})
+        self.assertEqual(external, {'stdio.h'})
+
+    def test_get_dependencies_from_file_with_comments(self):
+        internal, external = cdeps.get_dependencies_from_file(a('parsing/comment.h'))
+        self.assertEqual(internal, {'real.h'})
+        self.assertEqual(external, set())
+
+    def test_get_dependencies_from_file_with_crlf(self):
+        internal, external = cdeps.get_dependencies_from_file(a('parsing/crlf.h'))
+        self.assertEqual(internal, {'crlf_a.h'})
+        self.assertEqual(external, {'crlf_b.h'})
+
+    def test_get_dependencies_from_file_with_include_words(self):
+        internal, external = cdeps.get_dependencies_from_file(a('parsing/words.h'))
+        self.assertEqual(internal, {'after_define.h'})
+        self.assertEqual(external, {'after_int.h'})
+
+    def test_get_dependencies_from_edited_file(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'main.c')
+            with open(path, 'w') as file:
+                file.write('#include "before.h"\n')
+            os.utime(path, ns=(0, 0))
+            internal, _external = cdeps.get_dependencies_from_file(path)
+            self.assertEqual(internal, {'before.h'})
+
+            with open(path, 'w') as file:
+                file.write('#include "after.h"\n')
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            internal, _external = cdeps.get_dependencies_from_file(path)
+            self.assertEqual(internal, {'after.h'})
+
     def test_get_pairs_from_dir(self):
         pairs = cdeps.get_pairs_from_dir('tests/sources')
         expected = {
@@ -32,20 +104,36 @@ class TestCdeps(unittest.TestCase):
             cdeps.SourcePair(a('a.c'), a('a.h')),
             cdeps.SourcePair(a('sub/b.c'), a('sub/b.h')),
             cdeps.SourcePair(None, a('sub/constants.h')),
+            cdeps.SourcePair(None, a('parsing/bom.h')),
+            cdeps.SourcePair(None, a('parsing/comment.h')),
+            cdeps.SourcePair(None, a('parsing/crlf.h')),
+            cdeps.SourcePair(None, a('parsing/words.h')),
         }
         self.assertEqual(pairs, expected)
 
     def test_get_sources_and_headers_from_dir(self):
         sources, headers = cdeps.get_sources_and_headers_from_dir('tests/sources')
         expected_sources = {a('main.c'), a('a.c'), a('sub/b.c')}
-        expected_headers = {a('a.h'), a('sub/b.h'), a('sub/constants.h')}
+        expected_headers = {
+            a('a.h'), a('sub/b.h'), a('sub/constants.h'),
+            a('parsing/bom.h'), a('parsing/comment.h'), a('parsing/crlf.h'), a('parsing/words.h'),
+        }
         self.assertEqual(sources, expected_sources)
         self.assertEqual(headers, expected_headers)
 
+    def test_get_no_sources_and_headers_from_nonexistent_dir(self):
+        sources, headers = cdeps.get_sources_and_headers_from_dir('tests/nonexistent')
+        self.assertEqual(sources, set())
+        self.assertEqual(headers, set())
+
     def test_has_extension(self):
         result = cdeps.has_extension('main.cpp', ['.c', '.cpp'])
         self.assertTrue(result)
 
+    def test_has_multiple_suffix_extension(self):
+        result = cdeps.has_extension('archive.tar.gz', ['.tar.gz'])
+        self.assertTrue(result)
+
     def test_does_not_have_extension(self):
         result = cdeps.has_extension('library.h', ['.c', '.cc', '.C'])
         self.assertFalse(result)
@@ -54,6 +142,20 @@ class TestCdeps(unittest.TestCase):
         pair = cdeps.find_corresponding_pair('hello.cpp', {'hi.h', 'hi.hpp', 'hello.h', 'goodbye.h'}, ['.h', '.hpp'])
         self.assertEqual(pair, 'hello.h')
 
+    def test_find_corresponding_pair_in_frozenset(self):
+        headers = frozenset({'hi.h', 'hello.hpp', 'hello.h', 'goodbye.h'})
+        pair = cdeps.find_corresponding_pair('hello.cpp', headers, ['.h', '.hpp'])
+        self.assertEqual(pair, 'hello.h')
+        pair = cdeps.find_corresponding_pair('goodbye.cpp', headers, ['.hpp'])
+        self.assertIsNone(pair)
+
+    def test_find_corresponding_pair_with_multiple_suffixes(self):
+        for headers in ({'a.h', 'a.h.in'}, frozenset({'a.h', 'a.h.in'})):
+            pair = cdeps.find_corresponding_pair('a.c', headers, ['.h.in', '.h'])
+            self.assertEqual(pair, 'a.h.in')
+            pair = cdeps.find_corresponding_pair('a.c', headers, ['_h', '.in'])
+            self.assertIsNone(pair)
+
     def test_does_not_find_corresponding_pair(self):
         pair = cdeps.find_corresponding_pair('hello.h', {'nope.c', 'nop.cpp', 'nada.cc'}, ['.c', '.cpp', '.cc'])
         self.assertIsNone(pair)
@@ -91,10 +193,39 @@ class TestCdeps(unittest.TestCase):
         expected = a('sub/b.h')
         self.assertEqual(path, expected)
 
+    def test_resolve_include_parent_path(self):
+        path = cdeps.resolve_include_path('../a.h', 'tests/sources/sub')
+        expected = a('a.h')
+        self.assertEqual(path, expected)
+
     def test_resolve_include_nonexistent_path(self):
         with self.assertRaises(FileNotFoundError):
             cdeps.resolve_include_path('void.h', 'tests/sources/sub', ['tests/sources'])
 
+    def test_resolve_include_nonexistent_path_without_stat(self):
+        with mock.patch('os.path.exists') as exists:
+            with self.assertRaises(FileNotFoundError):
+                cdeps.resolve_include_path('void.h', 'tests/sources/sub', ['tests/sources'])
+            exists.assert_not_called()
+
+    def test_resolve_include_created_path(self):
+        with tempfile.TemporaryDirectory() as dir:
+            with self.assertRaises(FileNotFoundError):
+                cdeps.resolve_include_path('new.h', dir)
+            open(os.path.join(dir, 'new.h'), 'w').close()
+            path = cdeps.resolve_include_path('new.h', dir)
+            self.assertEqual(path, os.path.join(os.path.abspath(dir), 'new.h'))
+
+    def test_map_dependencies_from_pair_with_created_include(self):
+        with tempfile.TemporaryDirectory() as dir:
+            pairs = {cdeps.SourcePair(os.path.join(dir, 'main.c'), None)}
+            with open(os.path.join(dir, 'main.c'), 'w') as file:
+                file.write('#include "new.h"\n')
+            self.assertEqual(cdeps.map_dependencies_from_pairs(pairs), {os.path.join(dir, 'main'): set()})
+            open(os.path.join(dir, 'new.h'), 'w').close()
+            units = cdeps.map_dependencies_from_pairs(pairs)
+            self.assertEqual(units, {os.path.join(dir, 'main'): {os.path.join(dir, 'new')}})
+
     def test_get_dependent_units(self):
         units = {
             'main': {'stdio', 'a'},
@@ -131,6 +262,18 @@ class TestCdeps(unittest.TestCase):
         self.assertEqual(impacted, expected_impacted)
         self.assertEqual(unimpacted, expected_unimpacted)
 
+    def test_get_dependent_units_from_list(self):
+        units = {
+            'main': {'a'},
+            'a': {'stdio'},
+            'b': set(),
+        }
+        impacted, unimpacted = cdeps.get_dependent_units(units, ['stdio'])
+        expected_impacted = {'main', 'a'}
+        expected_unimpacted = {'b'}
+        self.assertEqual(impacted, expected_impacted)
+        self.assertEqual(unimpacted, expected_unimpacted)
+
     def test_remove_extension_from_file(self):
         name = cdeps.remove_extension('hello.txt')
         self.assertEqual(name, 'hello')
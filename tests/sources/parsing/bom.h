@@ -0,0 +1,2 @@
+﻿#include "bom_first.h"
+#include <stdio.h>
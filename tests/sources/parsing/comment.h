@@ -0,0 +1,3 @@
+// #include "commented.h"
+/* #include <commented.h> */
+#include "real.h"
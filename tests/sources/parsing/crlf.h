@@ -0,0 +1,7 @@
+#ifndef CRLF_H_INCLUDED
+#define CRLF_H_INCLUDED
+
+#include "crlf_a.h"
+#include <crlf_b.h>
+
+#endif
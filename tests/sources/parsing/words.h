@@ -0,0 +1,5 @@
+#define include_x 1
+#include "after_define.h"
+int include; // include twice
+#include <after_int.h>
+static int include_y; #include "not_at_line_start.h"